@@ -0,0 +1,289 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, TypeVar
+
+import aiohttp
+from aiolimiter import AsyncLimiter
+
+from .client import (
+    RATE_BURST,
+    RATE_LIMIT,
+    RATE_PERIOD,
+    RETRY_BACKOFF,
+    RETRY_STATUSES,
+    RETRY_TOTAL,
+    BacklogClient,
+    _create_temp,
+    _move_unique,
+    _remove_quietly,
+    _settings_from_env,
+)
+
+T = TypeVar("T")
+
+
+async def gather_cancelling(*aws: Awaitable[T]) -> List[T]:
+    """Run awaitables concurrently and return their results in order.
+
+    Unlike :func:`asyncio.gather`, the first failure cancels the remaining
+    awaitables and waits for them to finish before it is re-raised, so no work
+    outlives the caller (the semantics of ``asyncio.TaskGroup``, which needs
+    Python 3.11).
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    if not tasks:
+        return []
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()  # type: ignore[misc]
+    return [task.result() for task in tasks]
+
+
+async def _to_thread_uninterrupted(func: Callable[..., T], *args: Any) -> T:
+    """Run ``func`` in a worker thread and return its result even if cancelled.
+
+    A running thread cannot be stopped, so abandoning it on cancellation would
+    lose track of what it did (a file created or renamed). Instead the result
+    is returned and cancellation is requested again, taking effect at the
+    caller's next suspension point.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        result = await future
+        task = asyncio.current_task()
+        if task is not None:
+            task.cancel()
+        return result
+
+
+class AsyncBacklogClient:
+    """Asynchronous counterpart of :class:`BacklogClient`.
+
+    Requests share one ``aiohttp`` connection pool. At most ``concurrency``
+    requests are in flight at a time and the overall request rate is bounded
+    by an :class:`aiolimiter.AsyncLimiter`. Connection errors and the same
+    transient statuses as :class:`BacklogClient` are retried with exponential
+    backoff, honouring ``Retry-After`` when present. The client must be used as an
+    async context manager so that the session is created inside the running
+    event loop.
+    """
+
+    def __init__(
+        self,
+        space_domain: str,
+        api_key: str,
+        project_key: str,
+        *,
+        verify_ssl: bool = True,
+        concurrency: int = 16,
+    ):
+        self.space_domain = space_domain
+        self.api_key = api_key
+        self.project_key = project_key
+        self.base_url = f"https://{space_domain}/api/v2"
+        self.verify_ssl = verify_ssl
+        self.concurrency = concurrency
+        # Same quota and burst size as the synchronous RateLimiter.
+        self.limiter = AsyncLimiter(RATE_BURST, RATE_BURST * RATE_PERIOD / RATE_LIMIT)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.session: aiohttp.ClientSession | None = None
+
+    @classmethod
+    def from_env(cls) -> "AsyncBacklogClient":
+        space_domain, api_key, project_key, verify_ssl = _settings_from_env()
+        return cls(space_domain, api_key, project_key, verify_ssl=verify_ssl)
+
+    async def __aenter__(self) -> "AsyncBacklogClient":
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ssl=self.verify_ssl)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(sock_connect=5, sock_read=30),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP session."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @staticmethod
+    async def _raise_for_status(response: aiohttp.ClientResponse) -> None:
+        if response.status >= 400:
+            message = await response.text()
+            raise RuntimeError(f"API request failed: {response.status} {message}")
+
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: str | None = None) -> float:
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        return RETRY_BACKOFF * 2**attempt
+
+    @asynccontextmanager
+    async def _response(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any] | None = None,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Perform an API request and yield the successful response.
+
+        Retries are spaced outside the concurrency semaphore so that waiting
+        requests do not hold a slot.
+        """
+        if self.session is None:
+            raise RuntimeError("AsyncBacklogClient must be used with 'async with'")
+        query = dict(params or {})
+        query["apiKey"] = self.api_key
+        for attempt in range(RETRY_TOTAL + 1):
+            async with self._semaphore:
+                await self.limiter.acquire()
+                try:
+                    response = await self.session.request(
+                        method, f"{self.base_url}{path}", params=query
+                    )
+                except aiohttp.ClientConnectionError:
+                    if attempt == RETRY_TOTAL:
+                        raise
+                    delay = self._retry_delay(attempt)
+                else:
+                    if response.status in RETRY_STATUSES and attempt < RETRY_TOTAL:
+                        delay = self._retry_delay(
+                            attempt, response.headers.get("Retry-After")
+                        )
+                        response.release()
+                    else:
+                        try:
+                            await self._raise_for_status(response)
+                            yield response
+                        finally:
+                            response.release()
+                        return
+            await asyncio.sleep(delay)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any] | None = None,
+    ) -> Any:
+        """Perform an API request and return the decoded JSON body."""
+        async with self._response(method, path, params) as response:
+            return await response.json(content_type=None)
+
+    async def get_project_id(self) -> int:
+        statuses = await self._request("GET", f"/projects/{self.project_key}/statuses")
+        if not statuses:
+            raise RuntimeError("No statuses found for project")
+        return int(statuses[0]["projectId"])
+
+    async def get_document_list_page(
+        self, project_id: int, *, offset: int, count: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Retrieve a single page of documents.
+
+        ``offset`` must be zero or a positive integer. ``count`` specifies the
+        maximum number of items to return (1-100).
+        """
+        params = {
+            "projectId[]": project_id,
+            "offset": offset,
+            "count": count,
+        }
+        return await self._request("GET", "/documents", params)
+
+    async def get_document_list(
+        self, project_id: int, *, count: int = 100, window: int = 8
+    ) -> List[Dict[str, Any]]:
+        """Retrieve all documents for a project.
+
+        The first page is fetched on its own. If it is full, the following
+        ``window`` pages are requested concurrently, repeating until a short
+        page is returned. Pages after the first short page are discarded.
+        """
+        if count < 1 or count > 100:
+            raise ValueError("count must be between 1 and 100")
+
+        documents = await self.get_document_list_page(project_id, offset=0, count=count)
+        if len(documents) < count:
+            return documents
+
+        offset = count
+        while True:
+            pages = await gather_cancelling(
+                *[
+                    self.get_document_list_page(
+                        project_id, offset=offset + k * count, count=count
+                    )
+                    for k in range(window)
+                ]
+            )
+            for page in pages:
+                documents.extend(page)
+                if len(page) < count:
+                    return documents
+            offset += window * count
+
+    async def get_document_tree(self, project_id: int) -> Dict[str, Any]:
+        return await self._request(
+            "GET", "/documents/tree", {"projectIdOrKey": project_id}
+        )
+
+    async def get_document_info(self, document_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/documents/{document_id}")
+
+    async def download_attachment(
+        self,
+        document_id: str,
+        attachment_id: int,
+        output_dir: str,
+        *,
+        filename: str | None = None,
+    ) -> str:
+        """Download an attachment.
+
+        Behaves like :meth:`BacklogClient.download_attachment`.
+        """
+        async with self._response(
+            "GET", f"/documents/{document_id}/attachments/{attachment_id}"
+        ) as response:
+            disposition = response.headers.get("Content-Disposition", "")
+            parsed_name = BacklogClient._parse_filename(disposition)
+            if not filename:
+                filename = parsed_name or str(attachment_id)
+
+            # Stream into a temporary file so that a failed download never
+            # leaves a truncated file under the attachment's name. File I/O
+            # runs in worker threads so that other downloads keep making
+            # progress while the disk is busy.
+            tmp, fd = await _to_thread_uninterrupted(
+                _create_temp, output_dir, ".download."
+            )
+            try:
+                f = open(fd, "wb", buffering=1 << 20)
+                try:
+                    async for chunk in response.content.iter_chunked(1 << 20):
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    # Closing flushes the last buffered chunk.
+                    await _to_thread_uninterrupted(f.close)
+                return await _to_thread_uninterrupted(
+                    _move_unique, tmp, output_dir, filename
+                )
+            except BaseException:
+                _remove_quietly(tmp)
+                raise
@@ -1,25 +1,32 @@
 import argparse
+import asyncio
+import io
 import json
 import os
-from typing import Any, Dict, List
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
 
 from tqdm import tqdm
 
-from .client import BacklogClient
+from .async_client import AsyncBacklogClient, gather_cancelling
+from .client import BacklogClient, _create_temp, _remove_quietly
 
 
 def to_markdown_table(items: List[Dict[str, Any]], headers: List[str]) -> str:
-    lines = ["| " + " | ".join(headers) + " |"]
-    lines.append("|" + "|".join(["---"] * len(headers)) + "|")
+    buf = io.StringIO()
+    buf.write("| " + " | ".join(headers) + " |\n")
+    buf.write("|" + "|".join(["---"] * len(headers)) + "|")
     for item in items:
-        row = [str(item.get(h, "")) for h in headers]
-        lines.append("| " + " | ".join(row) + " |")
-    return "\n".join(lines)
+        buf.write("\n| ")
+        buf.write(" | ".join([str(item.get(h, "")) for h in headers]))
+        buf.write(" |")
+    return buf.getvalue()
 
 
-def print_document_list(client: BacklogClient) -> None:
-    project_id = client.get_project_id()
-    docs = client.get_document_list(project_id)
+async def print_document_list(client: AsyncBacklogClient) -> None:
+    project_id = await client.get_project_id()
+    docs = await client.get_document_list(project_id)
     for doc in docs:
         doc["url"] = (
             f"https://{client.space_domain}/document/"
@@ -33,35 +40,37 @@ def print_document_tree(client: BacklogClient) -> None:
     project_id = client.get_project_id()
     tree = client.get_document_tree(project_id)
 
-    def walk(nodes: List[Dict[str, Any]], indent: int = 0) -> List[str]:
-        lines = []
-        for node in nodes:
+    def walk(nodes: List[Dict[str, Any]]) -> Iterator[str]:
+        stack = [(node, 0) for node in reversed(nodes)]
+        while stack:
+            node, indent = stack.pop()
             children = node.get("children", [])
-            prefix = "  " * indent + "- " + node.get("name", "")
+            line = "  " * indent + "- " + node.get("name", "")
             if not children and "id" in node:
                 url = (
                     f"https://{client.space_domain}/document/"
                     f"{client.project_key}/{node['id']}"
                 )
-                prefix += f" - {url}"
-            lines.append(prefix)
-            lines.extend(walk(children, indent + 1))
-        return lines
+                line += f" - {url}"
+            yield line
+            stack.extend((child, indent + 1) for child in reversed(children))
 
     nodes = tree.get("activeTree", {}).get("children", [])
-    for line in walk(nodes):
-        print(line)
+    sys.stdout.writelines(line + "\n" for line in walk(nodes))
 
 
 def _dict_to_markdown(info: Dict[str, Any]) -> str:
-    lines = []
-    for key, value in info.items():
-        if isinstance(value, (dict, list)):
-            value_str = json.dumps(value, ensure_ascii=False)
-        else:
-            value_str = str(value)
-        lines.append(f"- **{key}**: {value_str}")
-    return "\n".join(lines)
+    dumps = json.dumps
+    return "\n".join(
+        [
+            (
+                f"- **{key}**: {dumps(value, ensure_ascii=False)}"
+                if isinstance(value, (dict, list))
+                else f"- **{key}**: {value}"
+            )
+            for key, value in info.items()
+        ]
+    )
 
 
 def print_document_info(client: BacklogClient, document_id: str) -> None:
@@ -72,57 +81,230 @@ def print_document_info(client: BacklogClient, document_id: str) -> None:
 def download_attachments(
     client: BacklogClient, document_id: str, output_dir: str = "."
 ) -> None:
+    info = client.get_document_info(document_id)
+    download_attachments_from_info(client, document_id, info, output_dir)
+
+
+def download_attachments_from_info(
+    client: BacklogClient,
+    document_id: str,
+    info: Dict[str, Any],
+    output_dir: str = ".",
+) -> None:
+    """Download the attachments listed in an already fetched document info."""
     os.makedirs(output_dir, exist_ok=True)
-    attachments = client.get_document_attachments(document_id)
-    for att in attachments:
-        path = client.download_attachment(
-            document_id,
-            att["id"],
-            output_dir,
-            filename=att.get("name"),
-        )
-        print(f"Downloaded {att['name']} -> {path}")
+    attachments = client.get_document_attachments(document_id, info=info)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(
+                client.download_attachment,
+                document_id,
+                att["id"],
+                output_dir,
+                filename=att.get("name"),
+            ): att
+            for att in attachments
+        }
+        for future in as_completed(futures):
+            path = future.result()
+            print(f"Downloaded {futures[future]['name']} -> {path}")
+
+
+_SAFE_NAME_TABLE = str.maketrans({"\\": "_", "/": "_"})
 
 
 def safe_name(name: str) -> str:
     """Return a filesystem-safe name."""
-    return "".join("_" if c in "\\/" else c for c in name)
+    return name.translate(_SAFE_NAME_TABLE)
 
 
-def export_all_documents(client: BacklogClient, output_dir: str = ".") -> None:
-    print("Fetching document tree...")
-    project_id = client.get_project_id()
-    tree = client.get_document_tree(project_id)
+def _write_document_md(dir_path: str, info: Dict[str, Any], content: str) -> None:
+    """Write ``document.md`` for a document atomically.
 
-    nodes = tree.get("activeTree", {}).get("children", [])
-    docs: List[tuple[str, List[str]]] = []
+    The payload is written to a temporary file in a single ``os.write`` call
+    and then moved into place, so an interrupted export never leaves a
+    truncated ``document.md`` behind.
+    """
+    payload = (_dict_to_markdown(info) + "\n\n" + content).encode("utf-8")
+    # A unique temporary name per call: several documents may share a folder
+    # and be written concurrently. The file gets the umask-derived mode that
+    # open() would have used.
+    tmp, fd = _create_temp(dir_path, ".document.md.")
+    try:
+        try:
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
+        os.replace(tmp, os.path.join(dir_path, "document.md"))
+    except BaseException:
+        _remove_quietly(tmp)
+        raise
+
+
+def _document_progress(iterable: Any = None, *, total: int) -> tqdm:
+    """Return a per-document progress bar that repaints sparingly.
+
+    The bar is redrawn at most every 0.5 seconds and only after roughly 0.5% of
+    ``total`` has completed, so large exports do not flood the terminal.
+    """
+    return tqdm(
+        iterable,
+        total=total,
+        desc="Documents",
+        unit="doc",
+        mininterval=0.5,
+        miniters=max(1, total // 200),
+        smoothing=0.1,
+    )
+
+
+MANIFEST_NAME = ".backlog_manifest.json"
+
+
+def _load_manifest(output_dir: str) -> Dict[str, Any]:
+    """Load the export manifest, returning an empty one if it is missing."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _save_manifest(output_dir: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _check_saved_attachment(path: str, size: Any) -> bool:
+    """Return whether ``path`` already holds an attachment of ``size`` bytes.
 
-    def gather(nodes: List[Dict[str, Any]], path: List[str]) -> None:
+    A file that does not match is removed so that the attachment is downloaded
+    again under the same name rather than with a ``_1`` suffix.
+    """
+    try:
+        if size is not None and os.path.getsize(path) == size:
+            return True
+    except OSError:
+        pass
+    _remove_quietly(path)
+    return False
+
+
+async def export_all_documents(
+    client: AsyncBacklogClient, output_dir: str = "."
+) -> None:
+    """Export every document and its attachments into ``output_dir``.
+
+    A manifest recording each document's ``updated`` timestamp and the
+    attachments saved for it is kept in ``output_dir``. On later runs,
+    documents whose timestamp is unchanged are skipped, and attachments whose
+    size matches the file already on disk are not downloaded again.
+    """
+    print("Fetching document tree...")
+    project_id = await client.get_project_id()
+    tree = await client.get_document_tree(project_id)
+
+    def iter_docs(
+        nodes: List[Dict[str, Any]], path: Tuple[str, ...] = ()
+    ) -> Iterator[Tuple[str, Tuple[str, ...], Any]]:
         for node in nodes:
-            name = safe_name(node.get("name", ""))
-            children = node.get("children", [])
-            new_path = path + [name]
+            new_path = path + (safe_name(node.get("name", "")),)
             if "id" in node:
-                docs.append((str(node["id"]), new_path))
-            if children:
-                gather(children, new_path)
+                yield str(node["id"]), new_path, node.get("updated")
+            yield from iter_docs(node.get("children", []), new_path)
 
-    gather(nodes, [])
+    os.makedirs(output_dir, exist_ok=True)
+    old_manifest = _load_manifest(output_dir)
+    manifest = dict(old_manifest)
+
+    async def fetch_attachment(
+        doc_id: str,
+        dir_path: str,
+        att: Dict[str, Any],
+        records: Dict[str, Any],
+    ) -> None:
+        key = str(att["id"])
+        old = records.get(key)
+        size = att.get("size")
+        old_path = (
+            os.path.normpath(os.path.join(output_dir, old["path"])) if old else ""
+        )
+        # Only reuse a record from this document's current folder. If the
+        # document moved in the tree, download it again and leave the files in
+        # the old folder alone.
+        same_dir = os.path.dirname(old_path) == os.path.normpath(dir_path)
+        if old and same_dir:
+            expected = size if old.get("size") == size else None
+            if await asyncio.to_thread(_check_saved_attachment, old_path, expected):
+                return
+        path = await client.download_attachment(
+            doc_id, att["id"], dir_path, filename=att.get("name")
+        )
+        records[key] = {"path": os.path.relpath(path, output_dir), "size": size}
+
+    async def fetch_doc(doc_id: str, dir_path: str, updated: Any) -> None:
+        entry = old_manifest.get(doc_id) or {}
+        if (
+            updated is not None
+            and entry.get("updated") == updated
+            and await asyncio.to_thread(
+                os.path.exists, os.path.join(dir_path, "document.md")
+            )
+        ):
+            progress.update(1)
+            return
+
+        info = await client.get_document_info(doc_id)
+        content = info.get("content") or info.get("text") or ""
+        # Documents sharing a folder may be written at the same time; this is
+        # safe because _write_document_md uses a unique temporary file.
+        await asyncio.to_thread(_write_document_md, dir_path, info, content)
+        attachments = info.get("attachments", [])
+        if not isinstance(attachments, list):
+            attachments = []
+        # Record each attachment as soon as it is saved so that a failed run
+        # keeps what it already downloaded. The document itself counts as up to
+        # date only once all of its attachments are done.
+        records = dict(entry.get("attachments", {}))
+        manifest[doc_id] = {"updated": None, "attachments": records}
+        await gather_cancelling(
+            *[fetch_attachment(doc_id, dir_path, att, records) for att in attachments]
+        )
+        keys = {str(att["id"]) for att in attachments}
+        manifest[doc_id] = {
+            "updated": updated,
+            "attachments": {k: v for k, v in records.items() if k in keys},
+        }
+        progress.update(1)
 
     print(f"Creating directory tree at {output_dir}...")
-    for _, parts in docs:
-        os.makedirs(os.path.join(output_dir, *parts), exist_ok=True)
+    nodes = tree.get("activeTree", {}).get("children", [])
+    dir_paths: Dict[Tuple[str, ...], str] = {}
+    current: set[str] = set()
+    jobs: List[Awaitable[None]] = []
+    for doc_id, parts, updated in iter_docs(nodes):
+        dir_path = dir_paths.get(parts)
+        if dir_path is None:
+            dir_path = os.path.join(output_dir, *parts)
+            os.makedirs(dir_path, exist_ok=True)
+            dir_paths[parts] = dir_path
+        current.add(doc_id)
+        jobs.append(fetch_doc(doc_id, dir_path, updated))
 
     print("Downloading documents...")
-    for doc_id, parts in tqdm(docs, desc="Documents", unit="doc"):
-        dir_path = os.path.join(output_dir, *parts)
-        info = client.get_document_info(doc_id)
-        content = info.get("content") or info.get("text") or ""
-        with open(os.path.join(dir_path, "document.md"), "w", encoding="utf-8") as f:
-            f.write(_dict_to_markdown(info))
-            f.write("\n\n")
-            f.write(content)
-        download_attachments(client, doc_id, dir_path)
+    with _document_progress(total=len(jobs)) as progress:
+        try:
+            await gather_cancelling(*jobs)
+            for doc_id in set(manifest) - current:
+                del manifest[doc_id]
+        finally:
+            _save_manifest(output_dir, manifest)
 
 
 def export_markdown_bundle(
@@ -158,7 +340,7 @@ def export_markdown_bundle(
         for line in tree_lines:
             f.write(line + "\n")
         f.write("\n")
-        for doc_id in tqdm(docs, desc="Documents", unit="doc"):
+        for doc_id in _document_progress(docs, total=len(docs)):
             info = client.get_document_info(doc_id)
             title = info.get("title", "")
             content = info.get("plain", "")
@@ -167,6 +349,11 @@ def export_markdown_bundle(
             f.write("\n\n")
 
 
+async def _run_async(func: Callable[..., Awaitable[None]], *args: Any) -> None:
+    async with AsyncBacklogClient.from_env() as client:
+        await func(client, *args)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Backlog Document Exporter")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -208,20 +395,22 @@ def main() -> None:
 
     args = parser.parse_args()
 
-    client = BacklogClient.from_env()
-
     if args.command == "list":
-        print_document_list(client)
-    elif args.command == "tree":
-        print_document_tree(client)
-    elif args.command == "info":
-        print_document_info(client, args.document_id)
-    elif args.command == "download":
-        download_attachments(client, args.document_id, args.output)
-    elif args.command == "export":
-        export_all_documents(client, args.output)
-    elif args.command == "export-md":
-        export_markdown_bundle(client, args.output)
+        asyncio.run(_run_async(print_document_list))
+        return
+    if args.command == "export":
+        asyncio.run(_run_async(export_all_documents, args.output))
+        return
+
+    with BacklogClient.from_env() as client:
+        if args.command == "tree":
+            print_document_tree(client)
+        elif args.command == "info":
+            print_document_info(client, args.document_id)
+        elif args.command == "download":
+            download_attachments(client, args.document_id, args.output)
+        elif args.command == "export-md":
+            export_markdown_bundle(client, args.output)
 
 
 if __name__ == "__main__":
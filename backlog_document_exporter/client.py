@@ -1,23 +1,138 @@
 import os
+import re
+import secrets
+import threading
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Backlog allows roughly 150 API calls per minute. Short bursts are allowed
+# as long as the average stays below that quota.
+RATE_LIMIT = 150
+RATE_PERIOD = 60.0
+RATE_BURST = 10
+
+# Transient failures are retried with exponential backoff by both clients.
+RETRY_TOTAL = 5
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# ``filename*=charset'lang'value`` (RFC 5987) and plain ``filename=value``;
+# either may be quoted. Parameter names match case-insensitively, as RFC 6266
+# requires.
+_FILENAME_EXT_RE = re.compile(
+    r"""filename\*\s*=\s*"?(?:[\w!#$%&+^`{}~-]*'[\w-]*')?(?P<value>[^";]*)""",
+    re.IGNORECASE,
+)
+_FILENAME_RE = re.compile(r'filename\s*=\s*"?(?P<value>[^";]*)', re.IGNORECASE)
 
 
 class RateLimiter:
-    def __init__(self, interval: float = 1.1):
-        """Simple rate limiter to wait between API calls."""
-        self.interval = interval
-        self._last_call = 0.0
+    def __init__(
+        self,
+        max_rate: float = RATE_LIMIT,
+        time_period: float = RATE_PERIOD,
+        burst: int = RATE_BURST,
+    ):
+        """Token-bucket rate limiter shared by API calls.
+
+        Up to ``burst`` calls may run back to back; beyond that, calls are
+        spaced so that at most ``max_rate`` happen per ``time_period`` seconds.
+        ``wait`` is safe to call from multiple threads.
+        """
+        self.rate = max_rate / time_period
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
 
     def wait(self) -> None:
-        now = time.time()
-        sleep_time = self._last_call + self.interval - now
-        if sleep_time > 0:
-            time.sleep(sleep_time)
-        self._last_call = time.time()
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            if self._tokens < 1:
+                time.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 0.0
+                self._last = time.monotonic()
+            else:
+                self._tokens -= 1
+
+
+def _settings_from_env() -> Tuple[str, str, str, bool]:
+    """Read connection settings from the environment (and ``.env``).
+
+    Returns ``(space_domain, api_key, project_key, verify_ssl)``.
+    """
+    load_dotenv()
+    api_key = os.getenv("BACKLOG_API_KEY")
+    project_key = os.getenv("BACKLOG_PROJECT_KEY")
+    space_domain = os.getenv("BACKLOG_SPACE_DOMAIN")
+    verify_ssl = os.getenv("BACKLOG_SSL_VERIFY", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    if not api_key or not project_key or not space_domain:
+        raise ValueError(
+            "BACKLOG_API_KEY, BACKLOG_PROJECT_KEY and "
+            "BACKLOG_SPACE_DOMAIN must be set"
+        )
+    return space_domain, api_key, project_key, verify_ssl
+
+
+def _create_temp(dir_path: str, prefix: str) -> Tuple[str, int]:
+    """Create a new temporary file in ``dir_path`` and return ``(path, fd)``.
+
+    Unlike :func:`tempfile.mkstemp`, the file is created with mode 0666 masked
+    by the process umask, as :func:`open` would, so it keeps the usual
+    permissions once renamed into place.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        path = os.path.join(dir_path, prefix + secrets.token_hex(8))
+        try:
+            return path, os.open(path, flags, 0o666)
+        except FileExistsError:
+            continue
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _move_unique(tmp: str, output_dir: str, filename: str) -> str:
+    """Move ``tmp`` to ``filename`` in ``output_dir`` without overwriting files.
+
+    If the name is taken, ``_1``, ``_2`` and so on are appended before the file
+    extension. The name is reserved with an exclusive create first so that
+    concurrent downloads into the same directory never pick the same name.
+    """
+    base, ext = os.path.splitext(filename)
+    path = os.path.join(output_dir, filename)
+    counter = 1
+    while True:
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            break
+        except FileExistsError:
+            path = os.path.join(output_dir, f"{base}_{counter}{ext}")
+            counter += 1
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        _remove_quietly(path)
+        raise
+    return path
 
 
 class BacklogClient:
@@ -35,23 +150,33 @@ class BacklogClient:
         self.base_url = f"https://{space_domain}/api/v2"
         self.verify_ssl = verify_ssl
         self.rate_limiter = RateLimiter()
+        self.session = requests.Session()
+        # Sent with every request; merged by the session so callers' params
+        # dictionaries are never modified.
+        self.session.params = {"apiKey": api_key}
+        retry = Retry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Close the underlying HTTP session."""
+        self.session.close()
+
+    def __enter__(self) -> "BacklogClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
     @classmethod
     def from_env(cls) -> "BacklogClient":
-        load_dotenv()
-        api_key = os.getenv("BACKLOG_API_KEY")
-        project_key = os.getenv("BACKLOG_PROJECT_KEY")
-        space_domain = os.getenv("BACKLOG_SPACE_DOMAIN")
-        verify_ssl = os.getenv("BACKLOG_SSL_VERIFY", "true").lower() in (
-            "1",
-            "true",
-            "yes",
-        )
-        if not api_key or not project_key or not space_domain:
-            raise ValueError(
-                "BACKLOG_API_KEY, BACKLOG_PROJECT_KEY and "
-                "BACKLOG_SPACE_DOMAIN must be set"
-            )
+        space_domain, api_key, project_key, verify_ssl = _settings_from_env()
         return cls(space_domain, api_key, project_key, verify_ssl=verify_ssl)
 
     def _request(
@@ -66,15 +191,47 @@ class BacklogClient:
         If ``raw`` is True, return the ``requests.Response`` object.
         """
         self.rate_limiter.wait()
-        if params is None:
-            params = {}
-        params["apiKey"] = self.api_key
-        response = requests.request(
+        response = self.session.request(
             method,
-            f"{self.base_url}{path}",
-            params=params,
+            self.base_url + path,
+            params=params or None,
             verify=self.verify_ssl,
+            timeout=(5, 30),
+        )
+        self._raise_for_status(response)
+        if raw:
+            return response
+        if response.headers.get("Content-Type", "").startswith("application/json"):
+            return response.json()
+        return response.content
+
+    def _request_stream(
+        self, path: str, params: Dict[str, Any] | None = None
+    ) -> requests.Response:
+        """Perform a streaming GET request and return the open response.
+
+        The body is not read; the caller is responsible for closing the
+        response. The read timeout bounds the wait between received bytes,
+        not the whole transfer, so large downloads are unaffected while a
+        stalled connection still fails.
+        """
+        self.rate_limiter.wait()
+        response = self.session.get(
+            self.base_url + path,
+            params=params or None,
+            stream=True,
+            verify=self.verify_ssl,
+            timeout=(5, 30),
         )
+        try:
+            self._raise_for_status(response)
+        except RuntimeError:
+            response.close()
+            raise
+        return response
+
+    @staticmethod
+    def _raise_for_status(response: requests.Response) -> None:
         try:
             response.raise_for_status()
         except requests.HTTPError as exc:
@@ -82,11 +239,6 @@ class BacklogClient:
             raise RuntimeError(
                 f"API request failed: {response.status_code} {message}"
             ) from exc
-        if raw:
-            return response
-        if response.headers.get("Content-Type", "").startswith("application/json"):
-            return response.json()
-        return response.content
 
     def get_project_id(self) -> int:
         statuses = self._request("GET", f"/projects/{self.project_key}/statuses")
@@ -136,15 +288,19 @@ class BacklogClient:
     def get_document_info(self, document_id: str) -> Dict[str, Any]:
         return self._request("GET", f"/documents/{document_id}")
 
-    def get_document_attachments(self, document_id: str) -> List[Dict[str, Any]]:
+    def get_document_attachments(
+        self, document_id: str, *, info: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
         """Return a list of attachments for a document.
 
         The Backlog Document API does not provide a dedicated endpoint for
         listing attachments. Instead, the attachments array is included in the
-        response of ``GET /api/v2/documents/:documentId``.
+        response of ``GET /api/v2/documents/:documentId``. Pass ``info`` if it
+        has already been fetched to avoid requesting it again.
         """
 
-        info = self.get_document_info(document_id)
+        if info is None:
+            info = self.get_document_info(document_id)
         attachments = info.get("attachments", [])
         if not isinstance(attachments, list):
             return []
@@ -167,38 +323,39 @@ class BacklogClient:
         extension so that existing files are not overwritten.
         """
 
-        response = self._request(
-            "GET",
-            f"/documents/{document_id}/attachments/{attachment_id}",
-            raw=True,
-        )
-
-        disposition = response.headers.get("Content-Disposition", "")
-        parsed_name = self._parse_filename(disposition)
-        if not filename:
-            filename = parsed_name or str(attachment_id)
+        with self._request_stream(
+            f"/documents/{document_id}/attachments/{attachment_id}"
+        ) as response:
+            disposition = response.headers.get("Content-Disposition", "")
+            parsed_name = self._parse_filename(disposition)
+            if not filename:
+                filename = parsed_name or str(attachment_id)
 
-        base, ext = os.path.splitext(filename)
-        path = os.path.join(output_dir, filename)
-        counter = 1
-        while os.path.exists(path):
-            path = os.path.join(output_dir, f"{base}_{counter}{ext}")
-            counter += 1
-
-        with open(path, "wb") as f:
-            f.write(response.content)
-        return path
+            # Stream into a temporary file so that a failed download never
+            # leaves a truncated file under the attachment's name.
+            tmp, fd = _create_temp(output_dir, ".download.")
+            try:
+                with open(fd, "wb", buffering=1 << 20) as f:
+                    for chunk in response.iter_content(chunk_size=1 << 20):
+                        f.write(chunk)
+                return _move_unique(tmp, output_dir, filename)
+            except BaseException:
+                _remove_quietly(tmp)
+                raise
 
     @staticmethod
     def _parse_filename(disposition: str) -> str | None:
-        """Extract a filename from a Content-Disposition header."""
+        """Extract a filename from a Content-Disposition header.
+
+        The RFC 5987 ``filename*`` form takes precedence over ``filename``.
+        Surrounding whitespace (including a stray CR) is stripped from the
+        value.
+        """
         disposition = disposition or ""
-        if "filename*=" in disposition:
-            part = disposition.split("filename*=")[-1].split(";")[0].strip()
-            if "''" in part:
-                part = part.split("''", 1)[1]
-            return requests.utils.unquote(part.strip('"'))
-        if "filename=" in disposition:
-            part = disposition.split("filename=")[-1].split(";")[0].strip()
-            return part.strip('"')
+        match = _FILENAME_EXT_RE.search(disposition)
+        if match:
+            return requests.utils.unquote(match.group("value").strip())
+        match = _FILENAME_RE.search(disposition)
+        if match:
+            return match.group("value").strip()
         return None